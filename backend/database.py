@@ -1,7 +1,9 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, text, event, inspect
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.sql import func
 from pathlib import Path
 from dotenv import load_dotenv
@@ -13,13 +15,83 @@ load_dotenv()
 # Fallback to local SQLite for local testing if DATABASE_URL is not set
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{Path(__file__).resolve().parent / 'acadrive.db'}")
 
-# Create database engine
-# connect_args is only for SQLite
-connect_args = {"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Swap sync driver schemes for their async counterparts so the same
+# DATABASE_URL works for local SQLite and hosted PostgreSQL
+if DATABASE_URL.startswith("sqlite://"):
+    DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+elif DATABASE_URL.startswith("postgres://"):  # Render-style URL
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+elif DATABASE_URL.startswith("postgresql://"):
+    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool tuning (PostgreSQL only; SQLite is a single local file).
+# Defaults follow the usual sizing advice: keep pool_size x workers below the
+# server's max_connections. LIFO checkout reuses the hottest connections and
+# pre-ping drops stale ones before they reach a request.
+pool_kwargs = {}
+if "sqlite" in DATABASE_URL:
+    # One long-lived SQLite connection reused for every request: no
+    # per-request open/close of the database file, pragmas applied once,
+    # and no writer-vs-writer contention between pooled connections
+    pool_kwargs = {"poolclass": StaticPool}
+else:
+    pool_kwargs = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "30")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,
+    }
+
+# Create async database engine
+engine = create_async_engine(DATABASE_URL, **pool_kwargs)
+
+# PostgreSQL gets tsvector full-text search, SQLite gets an FTS5 table;
+# ILIKE remains the last-resort fallback
+IS_POSTGRES = DATABASE_URL.startswith("postgresql")
+
+# True once init_db has created the SQLite FTS5 table (checked per request
+# by the search endpoint)
+FTS_ENABLED = False
+
+# WAL lets readers run while a write is in flight, and
+# synchronous=NORMAL skips the per-commit fsync that the default
+# FULL mode does (WAL stays consistent across crashes either way)
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # Wait for a busy writer instead of failing immediately
+    cursor.execute("PRAGMA busy_timeout=5000")
+    # 64 MB page cache (negative value = KiB)
+    cursor.execute("PRAGMA cache_size=-65536")
+    # Keep temp tables and indices out of the filesystem
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    # Memory-map up to 256 MB of the database file for reads
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+if "sqlite" in DATABASE_URL:
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+    # SQLite allows one writer but many concurrent WAL readers. The
+    # StaticPool engine above is the dedicated writer; reads go through
+    # a small bounded pool of their own connections so they never queue
+    # behind a write.
+    read_engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=int(os.getenv("DB_READ_POOL_SIZE", "4")),
+        max_overflow=0,
+    )
+    event.listen(read_engine.sync_engine, "connect", _set_sqlite_pragmas)
+else:
+    # PostgreSQL handles concurrent reads and writes on one pool
+    read_engine = engine
+
+# Create async session factories (writes vs. reads)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base class for database models
 Base = declarative_base()
@@ -36,14 +108,88 @@ class FileRecord(Base):
     file_type = Column(String(50), nullable=False) # e.g., 'image', 'pdf'
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-# Function to get a database session
-def get_db():
-    db = SessionLocal()
-    try:
+    # Fetch server defaults (created_at) via INSERT..RETURNING at flush,
+    # so no post-commit refresh round trip is needed
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        # Recent-files listing orders by created_at DESC
+        Index("ix_files_created_at_desc", created_at.desc()),
+        # Filtered search: subject and/or file_type, newest first
+        Index("ix_files_subject_type_created", "subject", "file_type", "created_at"),
+        # file_type-only filter can't use the composite above (subject is
+        # its leading column), so it gets its own index with the sort key
+        Index("ix_files_type_created", "file_type", "created_at"),
+    )
+
+# Function to get a database session (writer)
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+# Function to get a read-only database session
+async def get_read_db():
+    async with ReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-# Function to create the database and table
-def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+# Function to create the database and table.
+# Runs once per process (guarded below) and only from the startup hook,
+# never at import time. Set SKIP_DB_INIT=1 when the schema is managed
+# externally to skip the DDL round trips entirely.
+_db_initialized = False
+
+async def init_db():
+    global _db_initialized, FTS_ENABLED
+    if _db_initialized or os.getenv("SKIP_DB_INIT") == "1":
+        return
+    async with engine.begin() as conn:
+        # Hot start: if the schema is already in place, one catalog probe
+        # replaces the whole CREATE TABLE / CREATE INDEX / trigger DDL run
+        def _existing_tables(sync_conn):
+            inspector = inspect(sync_conn)
+            return inspector.has_table("files"), inspector.has_table("files_fts")
+
+        has_files, has_fts = await conn.run_sync(_existing_tables)
+        if has_files:
+            FTS_ENABLED = has_fts and not IS_POSTGRES
+            _db_initialized = True
+            return
+
+        await conn.run_sync(Base.metadata.create_all)
+        if IS_POSTGRES:
+            # GIN index over the same expression the search endpoint uses;
+            # 'simple' config so filenames aren't language-stemmed
+            await conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_files_fts ON files "
+                "USING gin (to_tsvector('simple', filename || ' ' || subject))"
+            ))
+        else:
+            # External-content FTS5 table kept in sync by triggers, so
+            # search is an index lookup instead of a LIKE '%q%' table scan
+            try:
+                await conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5"
+                    "(filename, subject, content='files', content_rowid='id')"
+                ))
+                await conn.execute(text(
+                    "CREATE TRIGGER IF NOT EXISTS files_fts_ai AFTER INSERT ON files BEGIN "
+                    "INSERT INTO files_fts(rowid, filename, subject) "
+                    "VALUES (new.id, new.filename, new.subject); END"
+                ))
+                await conn.execute(text(
+                    "CREATE TRIGGER IF NOT EXISTS files_fts_ad AFTER DELETE ON files BEGIN "
+                    "INSERT INTO files_fts(files_fts, rowid, filename, subject) "
+                    "VALUES ('delete', old.id, old.filename, old.subject); END"
+                ))
+                await conn.execute(text(
+                    "CREATE TRIGGER IF NOT EXISTS files_fts_au AFTER UPDATE ON files BEGIN "
+                    "INSERT INTO files_fts(files_fts, rowid, filename, subject) "
+                    "VALUES ('delete', old.id, old.filename, old.subject); "
+                    "INSERT INTO files_fts(rowid, filename, subject) "
+                    "VALUES (new.id, new.filename, new.subject); END"
+                ))
+                FTS_ENABLED = True
+            except OperationalError:
+                # SQLite built without FTS5; the ILIKE fallback still works
+                FTS_ENABLED = False
+    _db_initialized = True
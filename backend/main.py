@@ -1,32 +1,149 @@
 import os
-import aiofiles
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+import re
+import sys
+import time
+import logging
+import uuid
+import asyncio
+import hashlib
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, distinct
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, distinct, func, text
 from pathlib import Path
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel # Import BaseModel
 from dotenv import load_dotenv # Import load_dotenv
 
 # Import database setup and model
-from database import get_db, FileRecord, init_db
+import database
+from database import get_db, get_read_db, FileRecord, init_db, IS_POSTGRES
+
+# caio submits file I/O through a single io_uring queue on Linux, so
+# concurrent writes don't each need a thread-pool worker
+try:
+    from caio import AsyncioContext
+except ImportError:
+    AsyncioContext = None
 
 # --- SETUP ---
 load_dotenv() # Load variables from .env file
 
+# Buffered stderr logging instead of print() in request handlers
+logger = logging.getLogger("acadrive")
+
 # Get the directory where this main.py file is located
 BACKEND_DIR = Path(__file__).resolve().parent
 # Define the directory to store uploads within the backend folder
 UPLOADS_DIR = BACKEND_DIR / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True) # Create the folder if it doesn't exist
 
-# Initialize database tables on startup
-init_db()
+# Limits for local uploads
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
+MAX_UPLOAD_SIZE = MAX_UPLOAD_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1 << 20 # Stream uploads in 1 MiB chunks
+
+# Compiled once at import; strips everything but safe extension characters
+SAFE_EXT_RE = re.compile(r"[^A-Za-z0-9.]")
+# Compiled once at import; splits search input into FTS match tokens
+SEARCH_TOKEN_RE = re.compile(r"\w+")
+
+class FileTooLargeError(Exception):
+    pass
+
+# --- TINY READ CACHE ---
+# Hot read endpoints (/stats, /files/recent) hit the database on every
+# request even though the data only changes on upload. Cache responses
+# for a short TTL and bump the version on every write so new uploads
+# show up immediately.
+CACHE_TTL = float(os.getenv("CACHE_TTL_SECONDS", "5"))
+_cache = {}
+_cache_version = 0
+
+def cache_get(key: str):
+    entry = _cache.get(key)
+    if entry and entry[0] == _cache_version and time.monotonic() - entry[1] < CACHE_TTL:
+        return entry[2]
+    return None
+
+def cache_set(key: str, value):
+    _cache[key] = (_cache_version, time.monotonic(), value)
+
+def cache_invalidate():
+    global _cache_version
+    _cache_version += 1
+
+# Copy an uploaded file to disk in chunks, enforcing the size limit.
+# Runs in a worker thread: one to_thread dispatch per upload instead of
+# one per open/write/close like aiofiles.
+def _write_file_sync(src, dest: Path):
+    size = 0
+    digest = hashlib.sha256()
+    with open(dest, "wb") as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_SIZE:
+                raise FileTooLargeError()
+            digest.update(chunk)
+            out.write(chunk)
+    return size, digest.hexdigest()
+
+# Copy an uploaded file to disk through the io_uring submission queue.
+# Unlike the thread-pool path, many in-flight writes share one queue
+# instead of holding one OS thread each. Plain buffered writes are used:
+# O_DIRECT needs aligned buffers and offsets, which uploads don't have.
+async def _write_file_caio(src, dest: Path):
+    size = 0
+    digest = hashlib.sha256()
+    fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            offset = size
+            size += len(chunk)
+            if size > MAX_UPLOAD_SIZE:
+                raise FileTooLargeError()
+            digest.update(chunk)
+            await caio_context.write(chunk, fd, offset)
+    finally:
+        os.close(fd)
+    return size, digest.hexdigest()
+
+# Write an upload via io_uring where available, thread pool otherwise.
+# Returns (size, sha256 hex digest) of the written content.
+async def write_upload(src, dest: Path):
+    if caio_context is not None:
+        return await _write_file_caio(src, dest)
+    return await asyncio.to_thread(_write_file_sync, src, dest)
 
-app = FastAPI(title="Acadrive API")
+# Extension -> file type, resolved with a single dict lookup
+FILE_TYPES = {
+    ".pdf": "pdf",
+    ".png": "image", ".jpg": "image", ".jpeg": "image", ".gif": "image", ".webp": "image",
+    ".doc": "document", ".docx": "document",
+    ".ppt": "presentation", ".pptx": "presentation",
+    ".txt": "text", ".md": "text",
+}
+
+# Determine file type from the filename extension
+def get_file_type(filename: str) -> str:
+    return FILE_TYPES.get(os.path.splitext(filename)[1].lower(), "other")
+
+# orjson serializes responses several times faster than stdlib json
+app = FastAPI(title="Acadrive API", default_response_class=ORJSONResponse)
+
+# io_uring context for upload writes (Linux only, set up on startup)
+caio_context = None
+
+# Initialize database tables on startup
+@app.on_event("startup")
+async def on_startup():
+    global caio_context
+    await init_db()
+    if sys.platform == "linux" and AsyncioContext is not None:
+        caio_context = AsyncioContext(max_requests=128)
 
 # --- MIDDLEWARE (For CORS) ---
 app.add_middleware(
@@ -43,7 +160,23 @@ class FileUploadRequest(BaseModel):
     file_url: str
     filename: str
     file_size: int
+    # Optional: derived from the filename when the client doesn't send it
+    file_type: Optional[str] = None
+
+# --- Pydantic Model for file responses ---
+# Declared once with from_attributes so endpoints return ORM objects
+# directly and Pydantic serializes them, instead of hand-building a dict
+# per row
+class FileOut(BaseModel):
+    model_config = {"from_attributes": True}
+
+    id: int
+    filename: str
+    subject: str
+    file_url: str
+    file_size: int
     file_type: str
+    created_at: Optional[datetime] = None
 
 # --- API ENDPOINTS ---
 
@@ -59,11 +192,33 @@ async def get_config():
         raise HTTPException(status_code=500, detail="Cloudinary config not set")
     return {"cloud_name": cloud_name}
 
+# Signature for signed direct-to-Cloudinary uploads. The browser sends the
+# file straight to Cloudinary (no file bytes through this server); this
+# endpoint only signs the request parameters.
+@app.get("/upload/signature")
+async def get_upload_signature():
+    cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME")
+    api_key = os.getenv("CLOUDINARY_API_KEY")
+    api_secret = os.getenv("CLOUDINARY_API_SECRET")
+    if not (cloud_name and api_key and api_secret):
+        raise HTTPException(status_code=500, detail="Cloudinary config not set")
+    timestamp = int(time.time())
+    # Cloudinary signs the sorted params followed by the API secret
+    params_to_sign = f"folder=acadrive_uploads&timestamp={timestamp}"
+    signature = hashlib.sha1(f"{params_to_sign}{api_secret}".encode()).hexdigest()
+    return {
+        "cloud_name": cloud_name,
+        "api_key": api_key,
+        "timestamp": timestamp,
+        "folder": "acadrive_uploads",
+        "signature": signature,
+    }
+
 # UPDATED: /upload/ endpoint to accept JSON
-@app.post("/upload/")
+@app.post("/upload/", response_model=FileOut)
 async def upload_file(
     upload_data: FileUploadRequest, # Use the Pydantic model
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         # We are receiving data *after* it's on Cloudinary
@@ -74,63 +229,180 @@ async def upload_file(
             file_path=upload_data.file_url, # Store the Cloudinary URL
             file_url=upload_data.file_url,  # Store the Cloudinary URL
             file_size=upload_data.file_size,
-            file_type=upload_data.file_type
+            file_type=upload_data.file_type or get_file_type(upload_data.filename)
         )
         db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
-        
-        # Return data matching frontend expectations
-        return {
-            "id": db_file.id, "filename": db_file.filename, "subject": db_file.subject,
-            "file_url": db_file.file_url, "file_size": db_file.file_size,
-            "file_type": db_file.file_type, "created_at": db_file.created_at
-        }
+        await db.commit()
+        # No refresh needed: expire_on_commit=False and eager_defaults
+        # mean id and created_at are already populated
+        cache_invalidate()
+
+        return db_file
     except Exception as e:
-        print(f"Error during upload processing: {e}") 
+        logger.exception("Error during upload processing")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-@app.get("/files/recent")
-def get_recent_files(db: Session = Depends(get_db)):
-    return db.query(FileRecord).order_by(FileRecord.created_at.desc()).limit(4).all()
+# Local-disk upload (for deployments with a persistent disk instead of Cloudinary)
+@app.post("/upload/local", response_model=FileOut)
+async def upload_file_local(
+    subject: str = Form(...),
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db)
+):
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    # Keep only safe characters in the stored extension
+    ext = SAFE_EXT_RE.sub("", os.path.splitext(file.filename)[1].lower())
+
+    # File type comes from the filename, so we don't need the file contents
+    file_type = get_file_type(file.filename)
+
+    # Stream the upload to a temporary name while hashing it, then store
+    # it under its content hash. No exists() probe loop: identical content
+    # maps to the same name, different content can't collide.
+    tmp_path = UPLOADS_DIR / f".tmp_{uuid.uuid4().hex}"
+    try:
+        file_size, content_hash = await write_upload(file.file, tmp_path)
+    except FileTooLargeError:
+        tmp_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail=f"File too large (max {MAX_UPLOAD_MB} MB)")
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        logger.exception("Error during upload processing")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+    # Atomic move onto the final name: no exists() probe, and concurrent
+    # uploads of identical content both land on the same file without a
+    # check-then-rename race (replacing it with identical bytes is harmless)
+    file_path = UPLOADS_DIR / f"{content_hash[:16]}{ext}"
+    tmp_path.replace(file_path)
+
+    db_file = FileRecord(
+        filename=file.filename,
+        subject=subject,
+        file_path=str(file_path),
+        file_url=f"/uploads/{file_path.name}",
+        file_size=file_size,
+        file_type=file_type
+    )
+    db.add(db_file)
+    await db.commit()
+    cache_invalidate()
+
+    return db_file
+
+@app.get("/files/recent", response_model=List[FileOut])
+async def get_recent_files(db: AsyncSession = Depends(get_read_db)):
+    cached = cache_get("recent")
+    if cached is not None:
+        return cached
+    # Plain row mappings: no ORM instance built per row, orjson-encoded
+    # straight from the tuples the driver hands back
+    result = await db.execute(
+        select(*SEARCH_COLUMNS).order_by(FileRecord.created_at.desc()).limit(4)
+    )
+    files = result.mappings().all()
+    cache_set("recent", files)
+    return files
+
+# Columns the frontend actually renders; no need to hydrate ORM objects
+SEARCH_COLUMNS = (
+    FileRecord.id, FileRecord.filename, FileRecord.subject,
+    FileRecord.file_url, FileRecord.file_size, FileRecord.file_type,
+    FileRecord.created_at,
+)
 
 @app.get("/search/")
-def search_files(query: Optional[str] = None, subject: Optional[str] = None, file_type: Optional[str] = None, db: Session = Depends(get_db)):
-    search_query = db.query(FileRecord)
-    
+async def search_files(query: Optional[str] = None, subject: Optional[str] = None, file_type: Optional[str] = None, limit: int = Query(50, ge=1, le=100), offset: int = Query(0, ge=0), db: AsyncSession = Depends(get_read_db)):
+    # Whitespace-only input is not a query; skip the match clause entirely
+    if query:
+        query = query.strip()
+
+    # The default browse view (no query, no filters, first page) is the
+    # hottest search request; serve it from the short-TTL cache
+    browse_key = None
+    if not query and not subject and not file_type and offset == 0:
+        browse_key = f"search:{limit}"
+        cached = cache_get(browse_key)
+        if cached is not None:
+            return cached
+
+    search_query = select(*SEARCH_COLUMNS)
+
     if query:
-        search_filter = f"%{query}%"
-        search_query = search_query.filter(
-            or_(
-                FileRecord.filename.ilike(search_filter),
-                FileRecord.subject.ilike(search_filter)
+        if IS_POSTGRES:
+            # Full-text search; written as text so the expression matches
+            # the GIN index in init_db verbatim (bound 'simple'/' ' params
+            # would stop the planner from using it)
+            search_query = search_query.filter(text(
+                "to_tsvector('simple', filename || ' ' || subject) "
+                "@@ plainto_tsquery('simple', :fts_query)"
+            ).bindparams(fts_query=query))
+        elif database.FTS_ENABLED and (tokens := SEARCH_TOKEN_RE.findall(query)):
+            # FTS5 prefix match via the trigger-maintained files_fts table;
+            # tokens are quoted so user input can't break the MATCH syntax
+            match_expr = " ".join(f'"{token}"*' for token in tokens)
+            search_query = search_query.filter(text(
+                "files.id IN (SELECT rowid FROM files_fts WHERE files_fts MATCH :match_expr)"
+            ).bindparams(match_expr=match_expr))
+        else:
+            search_filter = f"%{query}%"
+            search_query = search_query.filter(
+                or_(
+                    FileRecord.filename.ilike(search_filter),
+                    FileRecord.subject.ilike(search_filter)
+                )
             )
-        )
-    if subject and subject != "All Subjects": 
+    if subject and subject != "All Subjects":
         search_query = search_query.filter(FileRecord.subject == subject)
-    if file_type and file_type != "All Types": 
+    if file_type and file_type != "All Types":
         search_query = search_query.filter(FileRecord.file_type == file_type)
-        
-    return search_query.order_by(FileRecord.created_at.desc()).all()
+
+    result = await db.execute(
+        search_query.order_by(FileRecord.created_at.desc()).limit(limit).offset(offset)
+    )
+    rows = result.mappings().all()
+    if browse_key is not None:
+        cache_set(browse_key, rows)
+    return rows
 
 @app.get("/stats")
-def get_stats(db: Session = Depends(get_db)):
-    total_files = db.query(FileRecord).count()
-    total_subjects = db.query(distinct(FileRecord.subject)).count()
-    return {
+async def get_stats(db: AsyncSession = Depends(get_read_db)):
+    cached = cache_get("stats")
+    if cached is not None:
+        return cached
+    # Both counts in one round trip
+    total_files, total_subjects = (await db.execute(
+        select(func.count(FileRecord.id), func.count(distinct(FileRecord.subject)))
+    )).one()
+    stats = {
         "total_files": total_files,
         "total_subjects": total_subjects,
         "active_users": "1" # Placeholder
     }
+    cache_set("stats", stats)
+    return stats
 
 @app.get("/subjects")
-def get_subjects(db: Session = Depends(get_db)):
-    subjects = db.query(distinct(FileRecord.subject)).order_by(FileRecord.subject.asc()).all()
-    return [subject[0] for subject in subjects if subject[0]]
+async def get_subjects(db: AsyncSession = Depends(get_read_db)):
+    cached = cache_get("subjects")
+    if cached is not None:
+        return cached
+    result = await db.execute(
+        select(distinct(FileRecord.subject)).order_by(FileRecord.subject.asc())
+    )
+    subjects = [subject for subject in result.scalars().all() if subject]
+    cache_set("subjects", subjects)
+    return subjects
 
 
 # --- SERVING STATIC FILES ---
-# We remove serving local /uploads/ files, as they are now on Cloudinary
+# Cloudinary uploads are served from Cloudinary; local uploads are served
+# straight from disk by StaticFiles (sendfile, Range and 304 support for
+# free) instead of going through an endpoint.
+app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+
 # We keep serving the frontend for local testing
 
 # Mounts the 'frontend' directory to serve index.html etc. at the root URL
@@ -139,4 +411,4 @@ app.mount("/", StaticFiles(directory="../frontend", html=True), name="frontend")
 # Allows running the server directly with 'python3 backend/main.py'
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, loop="uvloop", http="httptools")
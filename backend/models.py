@@ -1,13 +0,0 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
-from sqlalchemy.sql import func
-from .database import Base
-
-class FileRecord(Base):
-    __tablename__ = "files"
-    id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String, nullable=False)
-    subject = Column(String, nullable=False)
-    file_url = Column(Text, nullable=False)
-    file_size = Column(Integer, nullable=False)
-    file_type = Column(String, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file